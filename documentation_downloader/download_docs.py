@@ -8,135 +8,432 @@ Supports filtering by URL path patterns.
 
 import os
 import re
-import requests
+import sys
 import time
+import logging
+import threading
+import shutil
 import argparse
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urlparse
 from typing import List, Set, Dict
 
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
 # Documentation source URLs
 SOURCES = {
     'claude-docs': {
         'url': 'https://docs.anthropic.com/llms.txt',
-        'pattern': r'https://docs\.claude\.com/[^\s\)]+\.md',
+        'pattern': re.compile(r'https://docs\.claude\.com/[^\s\)]+\.md'),
         'name': 'Claude Docs'
     },
     'claude-code': {
         'url': 'https://code.claude.com/docs/llms.txt',
-        'pattern': r'https://[^\s\)]+\.md',
+        'pattern': re.compile(r'https://[^\s\)]+\.md'),
         'name': 'Claude Code Docs'
     }
 }
 
+# Number of files downloaded concurrently
+MAX_WORKERS = 8
+
+# Size of the chunks streamed from the network to disk
+CHUNK_SIZE = 64 * 1024
+
+# Maximum requests per second sent to each host
+RATE_LIMIT = 10
+
+# Minimum number of seconds between progress line refreshes
+PROGRESS_INTERVAL = 0.1
+
+# Flags for creating a download's temporary file (O_BINARY on Windows)
+TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+# Suffix of the sidecar files storing each download's ETag
+ETAG_SUFFIX = '.etag'
+
+# Outcomes of download_file
+DOWNLOADED = 'downloaded'
+NOT_MODIFIED = 'not_modified'
+FAILED = 'failed'
+
+# Shared HTTP session, created on first use so that `--help` does not pay for importing requests
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared HTTP session, creating it on first use.
+
+    Connections (and TLS handshakes) are reused across requests.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            class RateLimitedRetry(Retry):
+                """Retry policy that takes a rate-limiter token for every re-sent request."""
+
+                def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+                    new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+                    if _pool is not None:
+                        _get_limiter(_pool.host).acquire()
+                    return new_retry
+
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=MAX_WORKERS,
+                # Retry transient failures with capped exponential backoff, honouring
+                # Retry-After on 429/503; retries count against the per-host rate limit
+                max_retries=RateLimitedRetry(
+                    total=5,
+                    backoff_factor=0.5,
+                    backoff_max=10,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=['GET'],
+                    respect_retry_after_header=True
+                )
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+# Directories known to exist (normalized paths), to skip redundant makedirs calls
+_created_dirs: Set[str] = set()
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing bursts while bounding the average request rate."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# One rate limiter per host, created on first use. Retries re-sent inside urllib3
+# take their tokens through the session's Retry policy (see get_session).
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(host: str) -> RateLimiter:
+    """Return the rate limiter for a host."""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(RATE_LIMIT)
+        return _limiters[host]
+
 
 def fetch_urls_from_source(source_name: str, source_config: Dict, filter_pattern: str = None, follow_redirects: bool = True) -> Set[tuple]:
     """Fetch documentation URLs from a source URL. Returns set of (url, source_name) tuples."""
+    from requests.exceptions import RequestException
+
     urls = set()
 
     try:
-        print(f"Fetching URLs from {source_config['url']}...")
+        # Sources are fetched concurrently; log records are emitted as whole lines
+        logger.info(f"Fetching URLs from {source_config['url']}...")
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(
+        response = get_session().get(
             source_config['url'],
-            headers=headers,
             timeout=30,
             allow_redirects=follow_redirects
         )
 
         # Log redirects if any occurred
         if response.history:
-            for resp in response.history:
-                print(f"  -> Redirected from {resp.url} (HTTP {resp.status_code})")
-            print(f"  -> Final URL: {response.url}")
+            redirects = [f"  -> Redirected from {resp.url} (HTTP {resp.status_code})" for resp in response.history]
+            redirects.append(f"  -> Final URL: {response.url}")
+            logger.info("\n".join(redirects))
 
         response.raise_for_status()
 
         content = response.text
-        matches = re.findall(source_config['pattern'], content)
 
-        # Apply filter if provided
-        if filter_pattern:
-            matches = [url for url in matches if filter_pattern in url]
+        # Nothing can match if the filter does not occur anywhere in the index
+        if not filter_pattern or filter_pattern in content:
+            matches = (match.group(0) for match in source_config['pattern'].finditer(content))
+
+            # Apply filter if provided
+            if filter_pattern:
+                matches = (url for url in matches if filter_pattern in url)
 
-        # Store as tuples of (url, source_name)
-        for url in matches:
-            urls.add((url, source_name))
+            # Store as tuples of (url, source_name)
+            urls.update((url, source_name) for url in matches)
 
-        print(f"✓ Found {len(urls)} URLs from {source_config['name']}")
+        logger.info(f"✓ Found {len(urls)} URLs from {source_config['name']}")
 
-    except requests.exceptions.RequestException as e:
-        print(f"✗ Error fetching {source_config['url']}: {e}")
-        print("Please check your internet connection and try again.")
+    except RequestException as e:
+        logger.warning(f"✗ Error fetching {source_config['url']}: {e}\nPlease check your internet connection and try again.")
     except Exception as e:
-        print(f"✗ Unexpected error: {e}")
+        logger.warning(f"✗ Unexpected error: {e}")
 
     return urls
 
 
-def fetch_all_urls(sources: List[str], filter_pattern: str = None, follow_redirects: bool = True) -> Set[tuple]:
-    """Fetch URLs from multiple documentation sources. Returns set of (url, source_name) tuples."""
-    all_urls = set()
+def fetch_all_urls(sources: List[str], filter_pattern: str = None, follow_redirects: bool = True) -> Dict[str, List[str]]:
+    """Fetch URLs from multiple documentation sources.
 
-    for source_name in sources:
-        if source_name in SOURCES:
-            urls = fetch_urls_from_source(source_name, SOURCES[source_name], filter_pattern, follow_redirects)
-            all_urls.update(urls)
+    Returns a mapping of each unique URL to the names of the sources listing it,
+    so a URL indexed by several sources is only downloaded once.
+    """
+    url_map = {}
+    known_sources = [source_name for source_name in sources if source_name in SOURCES]
+
+    if not known_sources:
+        return url_map
+
+    # The index files are independent, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=len(known_sources)) as executor:
+        results = executor.map(
+            lambda source_name: fetch_urls_from_source(source_name, SOURCES[source_name], filter_pattern, follow_redirects),
+            known_sources
+        )
+        for urls in results:
+            for url, source_name in urls:
+                url_map.setdefault(url, []).append(source_name)
+
+    return url_map
+
+
+@functools.lru_cache(maxsize=4096)
+def _relative_path(url: str) -> str:
+    """Convert the path of a URL into a relative local path (cached per URL)."""
+    # Remove leading slash and split path
+    path_parts = urlparse(url).path.strip('/').split('/')
+    return os.path.join(*path_parts)
 
-    return all_urls
 
+def _ensure_dir(dir_path: str) -> None:
+    """Create a directory (and parents) unless it is already known to exist."""
+    # Normalize so equivalent spellings of a path share one cache entry
+    dir_path = os.path.normpath(dir_path)
+    if dir_path not in _created_dirs:
+        os.makedirs(dir_path, exist_ok=True)
+        _created_dirs.add(dir_path)
 
-def create_directory_structure(url: str, base_dir: str, source_name: str) -> str:
-    """Create directory structure based on URL path and return full file path.
+
+def get_local_path(url: str, base_dir: str, source_name: str) -> str:
+    """Return the local file path for a URL without touching the filesystem.
 
     Files are organized as: base_dir/source_name/url_path
     """
-    parsed = urlparse(url)
+    # Directory structure with source name as parent
+    return os.path.join(base_dir, source_name, _relative_path(url))
+
+
+def scan_existing_files(base_dir: str) -> Set[str]:
+    """Return the paths of all files (documents and ETag sidecars) already present under base_dir.
+
+    Directories found along the way are recorded as existing so they are not created again,
+    and ``.part`` files left behind by an interrupted run are removed.
+    """
+    existing = set()
+    for root, _, files in os.walk(base_dir):
+        _created_dirs.add(os.path.normpath(root))
+        for name in files:
+            if name.endswith('.part'):
+                os.remove(os.path.join(root, name))
+                continue
+            existing.add(os.path.join(root, name))
+    return existing
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to a file descriptor, retrying on short writes."""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def link_copies(local_path: str, copy_paths: List[str]) -> None:
+    """Populate copy_paths with the contents of local_path.
+
+    Hardlinks are used so duplicate files take no extra disk space, falling back
+    to a regular copy where linking is not possible. Existing copies are replaced,
+    and the ETag sidecar is copied along so each copy can be re-validated on its own.
+    """
+    etag_path = local_path + ETAG_SUFFIX
+    has_etag = os.path.exists(etag_path)
+    for copy_path in copy_paths:
+        _ensure_dir(os.path.dirname(copy_path))
+        temp_path = copy_path + '.part'
+        try:
+            try:
+                os.link(local_path, temp_path)
+            except OSError:
+                shutil.copyfile(local_path, temp_path)
+            os.replace(temp_path, copy_path)
+        except OSError:
+            # Do not leave a partial copy behind
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if has_etag:
+            shutil.copyfile(etag_path, copy_path + ETAG_SUFFIX)
+        elif os.path.exists(copy_path + ETAG_SUFFIX):
+            os.remove(copy_path + ETAG_SUFFIX)
+        logger.debug(f"✓ Linked: {copy_path}")
+
+
+def _save_etag(etag_path: str, etag: str) -> None:
+    """Store a download's ETag in its sidecar file, or remove the sidecar if there is none.
+
+    Failures are only logged: the file itself is already in place, and without
+    a sidecar the next run simply skips it or downloads it again.
+    """
+    try:
+        if etag:
+            with open(etag_path, 'w', encoding='utf-8') as f:
+                f.write(etag)
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(etag_path)
+    except OSError as e:
+        logger.warning(f"✗ Error saving ETag {etag_path}: {e}")
+        # Never leave a partial sidecar that would send a bogus If-None-Match
+        with contextlib.suppress(OSError):
+            os.remove(etag_path)
 
-    # Remove leading slash and split path
-    path_parts = parsed.path.strip('/').split('/')
 
-    # Create directory structure with source name as parent
-    dir_path = os.path.join(base_dir, source_name, *path_parts[:-1])
-    os.makedirs(dir_path, exist_ok=True)
+def download_file(url: str, local_path: str, copy_paths: List[str] = None, conditional: bool = False) -> str:
+    """Download a file from URL to local path, then link it to any copy_paths.
 
-    # Return full file path
-    filename = path_parts[-1]
-    return os.path.join(dir_path, filename)
+    The response body is streamed to a uniquely named temporary ``.part`` file
+    in chunks and renamed into place once complete, so an interrupted download
+    never leaves a truncated file that later runs would skip. The response ETag is stored in
+    a sidecar file; with conditional set, it is sent back as If-None-Match and
+    an unchanged file is left untouched.
 
+    Returns DOWNLOADED, NOT_MODIFIED or FAILED.
+    """
+    from requests.exceptions import RequestException
 
-def download_file(url: str, local_path: str) -> bool:
-    """Download a file from URL to local path."""
+    temp_path = None
+    etag_path = local_path + ETAG_SUFFIX
     try:
-        print(f"Downloading: {url}")
+        headers = {}
+        if conditional:
+            with open(etag_path, encoding='utf-8') as f:
+                headers['If-None-Match'] = f.read().strip()
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        # Be respectful to the server without delaying bursts unnecessarily
+        _get_limiter(urlparse(url).hostname).acquire()
 
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
+        logger.debug(f"Downloading: {url}")
+
+        with get_session().get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304:
+                logger.debug(f"Not modified: {local_path}")
+                if copy_paths:
+                    link_copies(local_path, [path for path in copy_paths if not os.path.exists(path)])
+                return NOT_MODIFIED
+
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+
+            # Ensure directory exists
+            _ensure_dir(os.path.dirname(local_path))
+
+            # The temp name is derived from the target, so leftovers can be traced back,
+            # and from the thread, so no two downloads ever share one
+            temp_path = f"{local_path}.{threading.get_ident()}.part"
 
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            # Write chunks straight to the descriptor; the chunks are already
+            # large, so a buffered file object would only add extra copies
+            fd = os.open(temp_path, TEMP_FLAGS, 0o666)
+            try:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    _write_all(fd, chunk)
+            finally:
+                os.close(fd)
 
-        with open(local_path, 'w', encoding='utf-8') as f:
-            f.write(response.text)
+        os.replace(temp_path, local_path)
 
-        print(f"✓ Saved: {local_path}")
-        return True
+        # Remember the ETag for conditional requests on the next run
+        _save_etag(etag_path, etag)
 
-    except requests.exceptions.RequestException as e:
-        print(f"✗ Failed to download {url}: {e}")
-        return False
+        logger.debug(f"✓ Saved: {local_path}")
+
+        if copy_paths:
+            link_copies(local_path, copy_paths)
+        return DOWNLOADED
+
+    except RequestException as e:
+        logger.warning(f"✗ Failed to download {url}: {e}")
     except Exception as e:
-        print(f"✗ Error saving {local_path}: {e}")
-        return False
+        logger.warning(f"✗ Error saving {local_path}: {e}")
+
+    # Remove any partially written file
+    if temp_path and os.path.exists(temp_path):
+        os.remove(temp_path)
+    return FAILED
+
+
+class ProgressAwareHandler(logging.StreamHandler):
+    """Stream handler that also owns an in-place progress line.
+
+    Progress updates and log records are both written under the handler lock,
+    so a record from a worker thread never lands on an unterminated progress line.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._progress_line_open = False
+
+    def show_progress(self, text: str) -> None:
+        """Rewrite the progress line in place."""
+        self.acquire()
+        try:
+            self.stream.write('\r' + text)
+            self.flush()
+            self._progress_line_open = True
+        finally:
+            self.release()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Called by handle() with the handler lock held
+        if self._progress_line_open:
+            self.stream.write('\n')
+            self._progress_line_open = False
+        super().emit(record)
+
+
+def print_progress(handler: ProgressAwareHandler, done: int, total: int) -> None:
+    """Rewrite a single progress line in place (interactive terminals only)."""
+    if sys.stdout.isatty():
+        handler.show_progress(f"[{done}/{total}] files downloaded")
 
 
 def main():
@@ -152,6 +449,7 @@ Examples:
   python download_docs.py --filter agent-sdk           # Filter by pattern
   python download_docs.py --no-follow-redirects        # Disable redirect following
   python download_docs.py --output custom_docs         # Custom output directory
+  python download_docs.py --verbose                    # Log every downloaded file
         """
     )
 
@@ -186,8 +484,20 @@ Examples:
         help='Disable following HTTP redirects (redirects are followed by default)'
     )
 
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Log each file as it is downloaded or skipped'
+    )
+
     args = parser.parse_args()
 
+    # Log to stdout so status messages stay in one stream with the rest of the output
+    handler = ProgressAwareHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(handlers=[handler])
+    logger.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
     # Determine which sources to use
     sources_to_fetch = []
     if args.claude_docs or args.claude_code:
@@ -208,47 +518,103 @@ Examples:
     if args.filter:
         print(f"Filtering URLs containing: '{args.filter}'")
 
-    url_tuples = fetch_all_urls(sources_to_fetch, args.filter, follow_redirects)
+    url_map = fetch_all_urls(sources_to_fetch, args.filter, follow_redirects)
 
-    print(f"Found {len(url_tuples)} unique URLs to download")
+    print(f"Found {len(url_map)} unique URLs to download")
 
-    if not url_tuples:
+    if not url_map:
         print("No URLs found. Exiting.")
         return
 
-    # Create base output directory
-    os.makedirs(args.output, exist_ok=True)
+    # Collect already downloaded files with a single walk of the output tree
+    existing_files = scan_existing_files(args.output)
 
     # Download each file
     successful = 0
     failed = 0
     skipped = 0
-
-    for i, (url, source_name) in enumerate(sorted(url_tuples), 1):
-        print(f"\n[{i}/{len(url_tuples)}]", end=" ")
-
-        # Create local file path maintaining directory structure with source name
-        local_path = create_directory_structure(url, args.output, source_name)
-
-        # Skip if file already exists
-        if os.path.exists(local_path):
-            print(f"Skipping (already exists): {local_path}")
+    pending = []
+    queued: Set[str] = set()
+
+    for url, source_names in sorted(url_map.items()):
+        # Local file paths maintaining directory structure with source name
+        local_paths = [get_local_path(url, args.output, source_name) for source_name in source_names]
+
+        # Different URLs (e.g. the same path on two hosts) can map to the same file;
+        # the first one claims it, as two downloads must never write one file at once
+        local_paths = [path for path in local_paths if path not in queued]
+        if not local_paths:
+            logger.debug(f"Skipping (same local path as another URL): {url}")
+            skipped += 1
+            continue
+        queued.update(local_paths)
+
+        existing = [path for path in local_paths if path in existing_files]
+        missing = [path for path in local_paths if path not in existing_files]
+
+        if existing:
+            # Re-validate from any copy with a stored ETag; other copies are refreshed from it
+            validated = [path for path in existing if path + ETAG_SUFFIX in existing_files]
+            if validated:
+                pending.append((url, validated[0], [path for path in local_paths if path != validated[0]], True))
+                continue
+
+            # Skip if file already exists, filling in any missing copies from disk
+            if missing:
+                try:
+                    link_copies(existing[0], missing)
+                except OSError as e:
+                    logger.warning(f"✗ Error copying {existing[0]}: {e}")
+                    failed += 1
+                    continue
+            logger.debug(f"Skipping (already exists): {existing[0]}")
             skipped += 1
             continue
 
-        # Download the file
-        if download_file(url, local_path):
-            successful += 1
-        else:
-            failed += 1
-
-        # Small delay to be respectful to the server
-        time.sleep(0.5)
+        # Download once, then link the file into the other source directories
+        pending.append((url, missing[0], missing[1:], False))
+
+    if pending:
+        print(f"\nDownloading {len(pending)} files ({MAX_WORKERS} at a time)...")
+
+    # Downloads are network-bound, so run them concurrently on a small thread pool.
+    # Each worker streams its file to disk as it arrives, so one worker's disk
+    # writes overlap with the network reads of the others without a separate
+    # writer pool (which would require buffering whole responses in memory).
+    # Threads are used rather than processes: decompressing small markdown files
+    # is cheap, and separate processes could not share the connection pool or
+    # the per-host rate limiters.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(download_file, url, local_path, copy_paths, conditional)
+            for url, local_path, copy_paths, conditional in pending
+        ]
+
+        last_refresh = 0.0
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                if result == DOWNLOADED:
+                    successful += 1
+                elif result == NOT_MODIFIED:
+                    skipped += 1
+                else:
+                    failed += 1
+
+                # Throttle progress output so the console is not flushed for every file
+                now = time.monotonic()
+                if now - last_refresh >= PROGRESS_INTERVAL or done == len(pending):
+                    print_progress(handler, done, len(pending))
+                    last_refresh = now
+        except KeyboardInterrupt:
+            # Drop queued downloads instead of waiting for all of them on exit
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
 
     print(f"\n" + "="*50)
     print(f"Download complete!")
     print(f"Successfully downloaded: {successful} files")
-    print(f"Skipped (already exist): {skipped} files")
+    print(f"Skipped (unchanged or already exist): {skipped} files")
     print(f"Failed downloads: {failed} files")
     print(f"Files saved to: {args.output}")
 